@@ -21,16 +21,24 @@ pub struct AppContext {
 /// Ensures all required application directories exist
 pub async fn ensure_directories(config: &BotConfig) -> Result<()> {
     // Ensure data directories exist
-    fs::create_dir_all(&config.data_dir).await.context(format!(
-        "Failed to create app data directory at {}",
-        config.data_dir.display()
-    ))?;
+    fs::create_dir_all(&config.data_dir)
+        .await
+        .with_context(|| {
+            format!(
+                "Failed to create app data directory at {}",
+                config.data_dir.display()
+            )
+        })?;
 
     let store_base_path = config.data_dir.join("matrix_sdk_store");
-    fs::create_dir_all(&store_base_path).await.context(format!(
-        "Failed to create matrix_sdk_store base directory at {}",
-        store_base_path.display()
-    ))?;
+    fs::create_dir_all(&store_base_path)
+        .await
+        .with_context(|| {
+            format!(
+                "Failed to create matrix_sdk_store base directory at {}",
+                store_base_path.display()
+            )
+        })?;
 
     Ok(())
 }
@@ -109,7 +117,7 @@ pub async fn init_matrix_client(config: &BotConfig) -> Result<AppContext> {
 }
 
 /// Setup the BotCore singleton and register event handlers
-pub async fn setup_bot_core(context: &AppContext) -> Result<()> {
+pub async fn setup_bot_core(context: &AppContext, config: &BotConfig) -> Result<()> {
     // --- Initialize BotCore (singleton) ---
     let bot_core_instance = Arc::new(BotCore::new(
         context.client.clone(),
@@ -120,11 +128,15 @@ pub async fn setup_bot_core(context: &AppContext) -> Result<()> {
         .map_err(|_| anyhow!("Failed to set BOT_CORE singleton"))?;
     info!("BotCore initialized and set globally.");
 
+    // --- Start persisting task list changes in the background ---
+    tokio::spawn(context.storage_manager.clone().run_flush_loop());
+    info!("Storage flush loop started.");
+
     // --- Register Event Handlers ---
     context
         .client
         .add_event_handler(matrix_integration::on_stripped_state_member);
-    matrix_integration::register_message_handler(&context.client);
+    matrix_integration::register_message_handler(&context.client, config.debug);
     info!("Matrix event handlers registered.");
 
     // --- Setup Verification Event Handlers ---
@@ -135,14 +147,14 @@ pub async fn setup_bot_core(context: &AppContext) -> Result<()> {
 
 /// Load the last saved bot state, if available
 pub async fn auto_load_bot_state(storage_manager: &Arc<StorageManager>) -> Result<()> {
-    match storage_manager.list_saved_files() {
-        Ok(files) => {
-            if let Some(most_recent_file) = files.last() {
+    match storage_manager.latest_saved_file().await {
+        Ok(latest) => {
+            if let Some(most_recent_file) = latest {
                 info!(
                     "Attempting to auto-load bot state from {}...",
                     most_recent_file
                 );
-                match storage_manager.load(most_recent_file).await {
+                match storage_manager.load(&most_recent_file).await {
                     Ok(true) => info!(
                         "Successfully auto-loaded bot state from {}",
                         most_recent_file
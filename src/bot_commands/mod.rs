@@ -1,4 +1,5 @@
-use crate::storage::StorageManager;
+use crate::messaging::{MessageSender, RichText, escape_html};
+use crate::storage::{StorageManager, parse_save_filename};
 use crate::task_management::TodoList;
 use anyhow::Result;
 use async_trait::async_trait;
@@ -6,7 +7,82 @@ use matrix_sdk::{
     Client,
     ruma::{OwnedRoomId, RoomId},
 };
-use std::sync::Arc;
+use once_cell::sync::Lazy;
+use std::{collections::HashMap, fmt::Write, sync::Arc};
+
+/// Top-level bot commands, resolved from the text following `!`
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum Command {
+    Add,
+    List,
+    Done,
+    Close,
+    Log,
+    Details,
+    Edit,
+    Bot,
+    Help,
+}
+
+/// Command name lookup table, built once on first use. Aliases are just
+/// extra keys for the same command.
+static COMMANDS: Lazy<HashMap<&'static str, Command>> = Lazy::new(|| {
+    HashMap::from([
+        ("add", Command::Add),
+        ("a", Command::Add),
+        ("list", Command::List),
+        ("l", Command::List),
+        ("done", Command::Done),
+        ("d", Command::Done),
+        ("close", Command::Close),
+        ("c", Command::Close),
+        ("log", Command::Log),
+        ("details", Command::Details),
+        ("edit", Command::Edit),
+        ("bot", Command::Bot),
+        ("help", Command::Help),
+    ])
+});
+
+/// `!help` response, plain text and HTML; both are fixed so they live in
+/// the binary rather than being rebuilt per request
+const HELP_TEXT: &str = "Matrix ToDo Bot Help:\n\n\
+**Task Commands:**\n\
+!add (!a) <task description> - Add a new task\n\
+!list (!l) - List all tasks\n\
+!done (!d) <id> - Mark a task as done\n\
+!close (!c) <id> - Mark a task as closed/completed\n\
+!log <id> <message> - Add a log entry to a task\n\
+!log <id> - Show logs for a task\n\
+!details <id> - Show full task details\n\
+!edit <id> <new description> - Edit a task description\n\n\
+**Bot Commands:**\n\
+!bot save - Save all lists\n\
+!bot load <filename> - Load lists from file\n\
+!bot loadlast - Load most recent save file\n\
+!bot listfiles - List all save files\n\
+!bot cleartasks - Clear the current room's list\n\n\
+**Other Commands:**\n\
+!help - Show this help message";
+
+const HELP_HTML: &str = "<h4>Matrix ToDo Bot Help</h4>\
+<strong>Task Commands:</strong><br>\
+<code>!add</code> (<code>!a</code>) <code>&lt;task description&gt;</code> - Add a new task<br>\
+<code>!list</code> (<code>!l</code>) - List all tasks<br>\
+<code>!done</code> (<code>!d</code>) <code>&lt;id&gt;</code> - Mark a task as done<br>\
+<code>!close</code> (<code>!c</code>) <code>&lt;id&gt;</code> - Mark a task as closed/completed<br>\
+<code>!log &lt;id&gt; &lt;message&gt;</code> - Add a log entry to a task<br>\
+<code>!log &lt;id&gt;</code> - Show logs for a task<br>\
+<code>!details &lt;id&gt;</code> - Show full task details<br>\
+<code>!edit &lt;id&gt; &lt;new description&gt;</code> - Edit a task description<br><br>\
+<strong>Bot Commands:</strong><br>\
+<code>!bot save</code> - Save all lists<br>\
+<code>!bot load &lt;filename&gt;</code> - Load lists from file<br>\
+<code>!bot loadlast</code> - Load most recent save file<br>\
+<code>!bot listfiles</code> - List all save files<br>\
+<code>!bot cleartasks</code> - Clear the current room's list<br><br>\
+<strong>Other Commands:</strong><br>\
+<code>!help</code> - Show this help message";
 
 #[async_trait]
 pub trait BotCommand: Send + Sync {
@@ -25,9 +101,7 @@ pub struct BotManagement {
 }
 
 impl BotManagement {
-    pub fn new(client: Client, storage: Arc<StorageManager>) -> Self {
-        // Create a message sender for this instance
-        let message_sender = Arc::new(crate::messaging::MatrixMessageSender::new(client));
+    pub fn new(message_sender: Arc<dyn MessageSender>, storage: Arc<StorageManager>) -> Self {
         Self {
             message_sender,
             storage,
@@ -38,9 +112,9 @@ impl BotManagement {
         let mut todo_lists = self.storage.todo_lists.lock().await;
         if todo_lists.contains_key(room_id) && !todo_lists[room_id].is_empty() {
             todo_lists.insert(room_id.clone(), Vec::new());
+            self.storage.mark_dirty();
             let message = "🗑️ List Cleared: The room's to-do list has been cleared.";
             self.send_matrix_message(room_id, message, None).await?;
-            self.storage.save().await?;
         } else {
             let message = "ℹ️ Info: There are no tasks in this room's to-do list to clear.";
             self.send_matrix_message(room_id, message, None).await?;
@@ -51,14 +125,11 @@ impl BotManagement {
     pub async fn save_command(&self, room_id: &OwnedRoomId) -> Result<()> {
         match self.storage.save().await {
             Ok(filename) => {
-                let message = format!(
-                    "💾 Lists Saved: The to-do lists have been saved to `{}`.",
-                    filename
-                );
-                let html_message = format!(
-                    "💾 Lists Saved: The to-do lists have been saved to <code>{}</code>.",
-                    filename
-                );
+                let (message, html_message) = RichText::new()
+                    .text("💾 Lists Saved: The to-do lists have been saved to ")
+                    .code(&filename)
+                    .text(".")
+                    .finish();
                 self.send_matrix_message(room_id, &message, Some(html_message))
                     .await?;
             }
@@ -80,15 +151,15 @@ impl BotManagement {
             return Ok(());
         }
 
-        if !self.storage.filename_pattern.is_match(&filename) {
-            let message = format!(
-                "❌ Invalid Filename Format: Filename '{}' does not match the expected format.",
-                filename
-            );
-            let html_message = format!(
-                "❌ Invalid Filename Format: Filename '<code>{}</code>' does not match the expected format.",
-                filename
-            );
+        if parse_save_filename(&filename).is_none() {
+            let (message, html_message) = RichText::new()
+                .text("❌ Invalid Filename Format: Filename '")
+                .rendered(
+                    &filename,
+                    &format!("<code>{}</code>", escape_html(&filename)),
+                )
+                .text("' does not match the expected format.")
+                .finish();
             self.send_matrix_message(room_id, &message, Some(html_message))
                 .await?;
             return Ok(());
@@ -96,26 +167,20 @@ impl BotManagement {
 
         match self.storage.load(&filename).await {
             Ok(true) => {
-                let message = format!(
-                    "📂 Lists Loaded: Successfully loaded to-do lists from `{}`.",
-                    filename
-                );
-                let html_message = format!(
-                    "📂 Lists Loaded: Successfully loaded to-do lists from <code>{}</code>.",
-                    filename
-                );
+                let (message, html_message) = RichText::new()
+                    .text("📂 Lists Loaded: Successfully loaded to-do lists from ")
+                    .code(&filename)
+                    .text(".")
+                    .finish();
                 self.send_matrix_message(room_id, &message, Some(html_message))
                     .await?;
             }
             Ok(false) => {
-                let message = format!(
-                    "❌ Error Loading: Failed to load lists from `{}`. Check the filename and ensure it's a valid save file.",
-                    filename
-                );
-                let html_message = format!(
-                    "❌ Error Loading: Failed to load lists from <code>{}</code>. Check the filename and ensure it's a valid save file.",
-                    filename
-                );
+                let (message, html_message) = RichText::new()
+                    .text("❌ Error Loading: Failed to load lists from ")
+                    .code(&filename)
+                    .text(". Check the filename and ensure it's a valid save file.")
+                    .finish();
                 self.send_matrix_message(room_id, &message, Some(html_message))
                     .await?;
             }
@@ -131,38 +196,28 @@ impl BotManagement {
     }
 
     pub async fn loadlast_command(&self, room_id: &OwnedRoomId) -> Result<()> {
-        let files = self.storage.list_saved_files()?;
-
-        if files.is_empty() {
+        let Some(most_recent_file) = self.storage.latest_saved_file().await? else {
             let message = "ℹ️ No Files Found: No saved to-do list files found.";
             self.send_matrix_message(room_id, message, None).await?;
             return Ok(());
-        }
-
-        let most_recent_file = files.last().cloned().unwrap();
+        };
 
         match self.storage.load(&most_recent_file).await {
             Ok(true) => {
-                let message = format!(
-                    "📂 Last List Loaded: Successfully loaded the most recent lists from `{}`.",
-                    most_recent_file
-                );
-                let html_message = format!(
-                    "📂 Last List Loaded: Successfully loaded the most recent lists from <code>{}</code>.",
-                    most_recent_file
-                );
+                let (message, html_message) = RichText::new()
+                    .text("📂 Last List Loaded: Successfully loaded the most recent lists from ")
+                    .code(&most_recent_file)
+                    .text(".")
+                    .finish();
                 self.send_matrix_message(room_id, &message, Some(html_message))
                     .await?;
             }
             Ok(false) => {
-                let message = format!(
-                    "❌ Error Loading: Failed to load the most recent lists from `{}`. The file might be corrupted.",
-                    most_recent_file
-                );
-                let html_message = format!(
-                    "❌ Error Loading: Failed to load the most recent lists from <code>{}</code>. The file might be corrupted.",
-                    most_recent_file
-                );
+                let (message, html_message) = RichText::new()
+                    .text("❌ Error Loading: Failed to load the most recent lists from ")
+                    .code(&most_recent_file)
+                    .text(". The file might be corrupted.")
+                    .finish();
                 self.send_matrix_message(room_id, &message, Some(html_message))
                     .await?;
             }
@@ -178,26 +233,19 @@ impl BotManagement {
     }
 
     pub async fn list_files_command(&self, room_id: &OwnedRoomId) -> Result<()> {
-        match self.storage.list_saved_files() {
+        match self.storage.list_saved_files().await {
             Ok(files) => {
                 if files.is_empty() {
                     let message = "ℹ️ No Files Found: No saved to-do list files found.";
                     self.send_matrix_message(room_id, message, None).await?;
                 } else {
-                    let files_list = files
-                        .iter()
-                        .enumerate()
-                        .map(|(i, f)| format!("{}. `{}`", i + 1, f))
-                        .collect::<Vec<String>>()
-                        .join("\n");
-                    let html_files_list = files
-                        .iter()
-                        .enumerate()
-                        .map(|(i, f)| format!("{}. <code>{}</code>", i + 1, f))
-                        .collect::<Vec<String>>()
-                        .join("<br>");
-                    let message = format!("📄 Available Save Files:\n{}", files_list);
-                    let html_message = format!("📄 Available Save Files:<br>{}", html_files_list);
+                    let mut text = RichText::new().text("📄 Available Save Files:");
+                    for (i, file) in files.iter().enumerate() {
+                        text = text.line_break();
+                        let _ = write!(text, "{}. ", i + 1);
+                        text = text.code(file);
+                    }
+                    let (message, html_message) = text.finish();
                     self.send_matrix_message(room_id, &message, Some(html_message))
                         .await?;
                 }
@@ -239,15 +287,15 @@ pub struct BotCore {
 
 impl BotCore {
     pub fn new(client: Client, storage_manager: Arc<StorageManager>) -> Self {
-        // Create the message sender for all components
-        let message_sender = Arc::new(crate::messaging::MatrixMessageSender::new(client.clone()));
+        // One message sender (and client handle) shared by all components
+        let message_sender: Arc<dyn MessageSender> =
+            Arc::new(crate::messaging::MatrixMessageSender::new(client));
 
-        // Initialize with the message sender
         let todo_lists = Arc::new(TodoList::new(
             message_sender.clone(),
             storage_manager.clone(),
         ));
-        let bot_management = Arc::new(BotManagement::new(client.clone(), storage_manager));
+        let bot_management = Arc::new(BotManagement::new(message_sender, storage_manager));
 
         Self {
             todo_lists,
@@ -264,31 +312,30 @@ impl BotCore {
     ) -> Result<()> {
         let room_id = room_id_str.parse::<OwnedRoomId>()?;
 
-        match command.trim().to_lowercase().as_str() {
+        match COMMANDS.get(command.trim().to_ascii_lowercase().as_str()) {
             // Task management commands
-            "add" => {
+            Some(Command::Add) => {
                 self.todo_lists
                     .add_task(&room_id, sender.clone(), args_str.clone())
                     .await?
             }
-            "list" => self.todo_lists.list_tasks(&room_id).await?,
-            "done" => {
-                if let Some(id) = parse_task_id(args_str.trim()) {
-                    self.todo_lists
-                        .done_task(&room_id, sender.clone(), id)
-                        .await?;
-                } else {
-                    let message = "⚠️ Error: Invalid task ID. Please provide a valid task number.";
-                    self.todo_lists
-                        .send_matrix_message(&room_id, message, None)
-                        .await?
-                }
-            }
-            "close" => {
+            Some(Command::List) => self.todo_lists.list_tasks(&room_id).await?,
+            // Commands whose only argument is a task number share one parse
+            Some(command @ (Command::Done | Command::Close | Command::Details)) => {
                 if let Some(id) = parse_task_id(args_str.trim()) {
-                    self.todo_lists
-                        .close_task(&room_id, sender.clone(), id)
-                        .await?;
+                    match command {
+                        Command::Done => {
+                            self.todo_lists
+                                .done_task(&room_id, sender.clone(), id)
+                                .await?
+                        }
+                        Command::Close => {
+                            self.todo_lists
+                                .close_task(&room_id, sender.clone(), id)
+                                .await?
+                        }
+                        _ => self.todo_lists.details_task(&room_id, id).await?,
+                    }
                 } else {
                     let message = "⚠️ Error: Invalid task ID. Please provide a valid task number.";
                     self.todo_lists
@@ -296,7 +343,7 @@ impl BotCore {
                         .await?
                 }
             }
-            "log" => {
+            Some(Command::Log) => {
                 let args = args_str.trim();
                 if args.is_empty() {
                     let message = "⚠️ Error: Missing task ID and log message.";
@@ -325,17 +372,7 @@ impl BotCore {
                         .await?
                 }
             }
-            "details" => {
-                if let Some(id) = parse_task_id(args_str.trim()) {
-                    self.todo_lists.details_task(&room_id, id).await?;
-                } else {
-                    let message = "⚠️ Error: Invalid task ID. Please provide a valid task number.";
-                    self.todo_lists
-                        .send_matrix_message(&room_id, message, None)
-                        .await?
-                }
-            }
-            "edit" => {
+            Some(Command::Edit) => {
                 let args = args_str.trim();
                 if args.is_empty() {
                     let message = "⚠️ Error: Missing task ID and new description.";
@@ -369,22 +406,24 @@ impl BotCore {
             }
 
             // Bot management commands
-            "bot" => {
-                let args = args_str.trim().to_lowercase();
-                let args_parts: Vec<&str> = args.split_whitespace().collect();
-                let bot_command = args_parts.first().cloned().unwrap_or("");
+            Some(Command::Bot) => {
+                // Only the subcommand is case-insensitive; save filenames contain an uppercase 'Z'
+                let args = args_str.trim();
+                let (bot_command, rest) =
+                    args.split_once(char::is_whitespace).unwrap_or((args, ""));
 
-                match bot_command {
+                match bot_command.to_ascii_lowercase().as_str() {
                     "save" => self.bot_management.save_command(&room_id).await?,
                     "load" => {
-                        if args_parts.len() < 2 {
+                        if let Some(filename) = rest.split_whitespace().next() {
+                            self.bot_management
+                                .load_command(&room_id, filename.to_string())
+                                .await?
+                        } else {
                             let message = "⚠️ Error: Missing filename. Usage: !bot load <filename>";
                             self.bot_management
                                 .send_matrix_message(&room_id, message, None)
                                 .await?;
-                        } else {
-                            let filename = args_parts[1].to_string();
-                            self.bot_management.load_command(&room_id, filename).await?
                         }
                     }
                     "loadlast" => self.bot_management.loadlast_command(&room_id).await?,
@@ -406,52 +445,14 @@ impl BotCore {
             }
 
             // Help command
-            "help" => {
-                let help_text = "Matrix ToDo Bot Help:\n\n\
-                **Task Commands:**\n\
-                !add <task description> - Add a new task\n\
-                !list - List all tasks\n\
-                !done <id> - Mark a task as done\n\
-                !close <id> - Mark a task as closed/completed\n\
-                !log <id> <message> - Add a log entry to a task\n\
-                !log <id> - Show logs for a task\n\
-                !details <id> - Show full task details\n\
-                !edit <id> <new description> - Edit a task description\n\n\
-                **Bot Commands:**\n\
-                !bot save - Save all lists\n\
-                !bot load <filename> - Load lists from file\n\
-                !bot loadlast - Load most recent save file\n\
-                !bot listfiles - List all save files\n\
-                !bot cleartasks - Clear the current room's list\n\n\
-                **Other Commands:**\n\
-                !help - Show this help message";
-
-                let html_help = "<h4>Matrix ToDo Bot Help</h4>\
-                <strong>Task Commands:</strong><br>\
-                <code>!add &lt;task description&gt;</code> - Add a new task<br>\
-                <code>!list</code> - List all tasks<br>\
-                <code>!done &lt;id&gt;</code> - Mark a task as done<br>\
-                <code>!close &lt;id&gt;</code> - Mark a task as closed/completed<br>\
-                <code>!log &lt;id&gt; &lt;message&gt;</code> - Add a log entry to a task<br>\
-                <code>!log &lt;id&gt;</code> - Show logs for a task<br>\
-                <code>!details &lt;id&gt;</code> - Show full task details<br>\
-                <code>!edit &lt;id&gt; &lt;new description&gt;</code> - Edit a task description<br><br>\
-                <strong>Bot Commands:</strong><br>\
-                <code>!bot save</code> - Save all lists<br>\
-                <code>!bot load &lt;filename&gt;</code> - Load lists from file<br>\
-                <code>!bot loadlast</code> - Load most recent save file<br>\
-                <code>!bot listfiles</code> - List all save files<br>\
-                <code>!bot cleartasks</code> - Clear the current room's list<br><br>\
-                <strong>Other Commands:</strong><br>\
-                <code>!help</code> - Show this help message";
-
+            Some(Command::Help) => {
                 self.todo_lists
-                    .send_matrix_message(&room_id, help_text, Some(html_help.to_string()))
+                    .send_matrix_message(&room_id, HELP_TEXT, Some(HELP_HTML.to_owned()))
                     .await?;
             }
 
             // Unknown command
-            _ => {
+            None => {
                 let message = format!(
                     "⚠️ Unknown command: '{}'. Type !help for available commands.",
                     command
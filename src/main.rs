@@ -2,7 +2,7 @@ use anyhow::Result;
 
 use once_cell::sync::OnceCell;
 use std::sync::Arc;
-use tracing::{debug, info};
+use tracing::{debug, error, info};
 
 // Import app constants from config module
 use crate::config::{APP_NAME, APP_VERSION};
@@ -19,19 +19,27 @@ mod task_management;
 
 // Module components we need to use
 use crate::bot_commands::BotCore;
-use config::init_config;
+use config::{BotConfig, init_config};
 
 // Global access to BotCore
 static BOT_CORE: OnceCell<Arc<BotCore>> = OnceCell::new();
 
-#[tokio::main]
-async fn main() -> Result<()> {
-    // Initialize configuration from arguments and environment variables
+fn main() -> Result<()> {
+    // Initialize configuration from arguments and environment variables.
+    // This happens before the runtime exists, so `--help` and `--version`
+    // exit without starting any worker threads.
     let config = init_config()?;
 
     // Initialize logging
     logging::init_logging(APP_NAME, config.debug)?;
 
+    tokio::runtime::Builder::new_multi_thread()
+        .enable_all()
+        .build()?
+        .block_on(run(config))
+}
+
+async fn run(config: BotConfig) -> Result<()> {
     info!("Starting {} v{}...", APP_NAME, APP_VERSION);
     debug!("Configuration: {:?}", config);
 
@@ -42,13 +50,42 @@ async fn main() -> Result<()> {
     let context = app::init_matrix_client(&config).await?;
 
     // Setup BotCore and event handlers
-    app::setup_bot_core(&context).await?;
+    app::setup_bot_core(&context, &config).await?;
 
     // Auto-load previous bot state if available
     app::auto_load_bot_state(&context.storage_manager).await?;
 
-    // Start the main sync loop
-    app::start_sync_loop(&context, &config).await?;
+    // Run the main sync loop until it gives up or the process is asked to stop
+    let sync_result = tokio::select! {
+        result = app::start_sync_loop(&context, &config) => result,
+        result = shutdown_signal() => {
+            info!("Shutdown signal received, stopping sync loop");
+            result
+        }
+    };
+
+    // The flush loop dies with the runtime; save anything it hasn't written yet
+    if let Err(e) = context.storage_manager.flush().await {
+        error!("Failed to save pending task list changes on exit: {}", e);
+    }
+
+    sync_result
+}
+
+/// Resolve once Ctrl-C, or SIGTERM on unix, is received
+async fn shutdown_signal() -> Result<()> {
+    #[cfg(unix)]
+    {
+        use tokio::signal::unix::{SignalKind, signal};
+
+        let mut sigterm = signal(SignalKind::terminate())?;
+        tokio::select! {
+            result = tokio::signal::ctrl_c() => result?,
+            _ = sigterm.recv() => {}
+        }
+    }
+    #[cfg(not(unix))]
+    tokio::signal::ctrl_c().await?;
 
     Ok(())
 }
@@ -1,9 +1,12 @@
 use anyhow::{Context, Result, anyhow, bail};
 use futures_util::stream::StreamExt;
 use matrix_sdk::encryption::verification::Verification;
+use matrix_sdk::ruma::DeviceId;
 use matrix_sdk::ruma::OwnedDeviceId;
+use matrix_sdk::ruma::OwnedUserId;
 use matrix_sdk::ruma::events::room::{
-    member::StrippedRoomMemberEvent, message::OriginalSyncRoomMessageEvent,
+    member::StrippedRoomMemberEvent,
+    message::{MessageType, OriginalSyncRoomMessageEvent},
 };
 use matrix_sdk::ruma::events::{
     ToDeviceEvent,
@@ -19,7 +22,6 @@ use matrix_sdk::{
     Client, Room, RoomState, SessionMeta, SessionTokens, authentication::matrix::MatrixSession,
     config::SyncSettings,
 };
-use ruma::DeviceId;
 use serde::{Deserialize, Serialize};
 use std::collections::HashMap;
 
@@ -29,8 +31,7 @@ use tracing::{debug, error, info, warn};
 
 use crate::config::APP_NAME;
 
-use rand::{Rng, rngs::ThreadRng};
-use rand_distr::Alphanumeric;
+use rand::{Rng, distributions::Alphanumeric, rngs::ThreadRng};
 use tokio::fs as async_fs; // For async file operations
 
 // Configuration for the SQLite store
@@ -59,10 +60,12 @@ pub async fn restore_session(
 
     let session_json = async_fs::read_to_string(session_file_path)
         .await
-        .context(format!(
-            "Failed to read session file: {}",
-            session_file_path.display()
-        ))?;
+        .with_context(|| {
+            format!(
+                "Failed to read session file: {}",
+                session_file_path.display()
+            )
+        })?;
 
     let persisted_session: PersistedSession =
         serde_json::from_str(&session_json).context("Failed to deserialize session data")?;
@@ -124,10 +127,12 @@ pub async fn login_and_save_session(
     let store_path = store_base_path.join(store_subdir_name);
     async_fs::create_dir_all(&store_path)
         .await
-        .context(format!(
-            "Failed to create store directory at {}",
-            store_path.display()
-        ))?;
+        .with_context(|| {
+            format!(
+                "Failed to create store directory at {}",
+                store_path.display()
+            )
+        })?;
 
     let store_passphrase: String = std::iter::repeat_with(|| rng.sample(Alphanumeric))
         .map(char::from)
@@ -217,10 +222,12 @@ pub async fn login_and_save_session(
         .context("Failed to serialize session data for saving")?;
     async_fs::write(session_file_path, session_json)
         .await
-        .context(format!(
-            "Failed to write session file to {}",
-            session_file_path.display()
-        ))?;
+        .with_context(|| {
+            format!(
+                "Failed to write session file to {}",
+                session_file_path.display()
+            )
+        })?;
 
     info!("Session saved to: {}", session_file_path.display());
     Ok((client, None, client_store_config))
@@ -253,10 +260,12 @@ pub async fn save_current_session(
         .context("Failed to serialize current session data for saving")?;
     async_fs::write(session_file_path, session_json)
         .await
-        .context(format!(
-            "Failed to write current session file to {}",
-            session_file_path.display()
-        ))?;
+        .with_context(|| {
+            format!(
+                "Failed to write current session file to {}",
+                session_file_path.display()
+            )
+        })?;
 
     info!(
         "Successfully saved current session to: {}",
@@ -532,58 +541,77 @@ pub async fn on_stripped_state_member(
     }
 }
 
-pub fn register_message_handler(client: &Client) {
+/// Register the command handler. With `debug`, failed commands are logged
+/// with the full Debug form of the error, including any backtrace.
+pub fn register_message_handler(client: &Client, debug: bool) {
+    // The bot's own ID never changes after login, so look it up once here
+    // rather than on every event
+    let bot_user_id: Option<OwnedUserId> = client.user_id().map(ToOwned::to_owned);
+
     // Register handler for room messages to process bot commands
     client.add_event_handler(
         // Closure for room messages
-        move |ev: OriginalSyncRoomMessageEvent, room: Room, _client_clone: Client| async move {
-            if room.state() != RoomState::Joined {
-                return;
-            }
+        move |ev: OriginalSyncRoomMessageEvent, room: Room| {
+            // Never act on the bot's own messages, e.g. sent from another session
+            let from_bot = bot_user_id.as_deref() == Some(&*ev.sender);
+            async move {
+                if from_bot {
+                    return;
+                }
+                // Most room traffic is ordinary chat: reject anything that isn't a
+                // '!' text command before touching the bot core or spawning a task
+                let MessageType::Text(text_content) = ev.content.msgtype else {
+                    return;
+                };
+                let body = text_content.body;
+                if !body.starts_with('!') || room.state() != RoomState::Joined {
+                    return;
+                }
 
-            let bot_core_ref = crate::BOT_CORE
-                .get()
-                .expect("BOT_CORE not initialized")
-                .clone();
-            tokio::spawn(async move {
-                let room_id_owned = room.room_id().to_owned();
+                let bot_core_ref = crate::BOT_CORE
+                    .get()
+                    .expect("BOT_CORE not initialized")
+                    .clone();
                 let sender = ev.sender.to_string();
-
-                if let matrix_sdk::ruma::events::room::message::MessageType::Text(text_content) =
-                    ev.content.msgtype
-                {
-                    let body = text_content.body;
-                    if body.starts_with('!') {
-                        debug!(
-                            "Received command: {} from {} in room {}",
-                            body, sender, room_id_owned
-                        );
-
-                        // Remove the leading '!' before splitting command and args
-                        let command_and_args = body.strip_prefix('!').unwrap_or_default().trim();
-                        let mut command_parts = command_and_args.splitn(2, ' ');
-                        let command = command_parts.next().unwrap_or("").to_lowercase();
-                        let args_str = command_parts.next().unwrap_or("").to_owned();
-
-                        if !command.is_empty() {
-                            if let Err(e) = bot_core_ref
-                                .process_command(
-                                    room_id_owned.as_str(),
-                                    sender.clone(),
-                                    &command,
-                                    args_str,
-                                )
-                                .await
-                            {
+                tokio::spawn(async move {
+                    let room_id_owned = room.room_id().to_owned();
+                    debug!(
+                        "Received command: {} from {} in room {}",
+                        body, sender, room_id_owned
+                    );
+
+                    let command_and_args = body[1..].trim();
+                    let (command, args_str) = command_and_args
+                        .split_once(' ')
+                        .unwrap_or((command_and_args, ""));
+
+                    if !command.is_empty() {
+                        if let Err(e) = bot_core_ref
+                            .process_command(
+                                room_id_owned.as_str(),
+                                sender.clone(),
+                                command,
+                                args_str.to_owned(),
+                            )
+                            .await
+                        {
+                            // `{:#}` prints the context chain; the Debug form (with any
+                            // backtrace) is only worth building when debugging
+                            if debug {
                                 error!(
                                     "Error processing command '{}' from sender {}: {:?}",
                                     command, sender, e
                                 );
+                            } else {
+                                error!(
+                                    "Error processing command '{}' from sender {}: {:#}",
+                                    command, sender, e
+                                );
                             }
                         }
                     }
-                }
-            });
+                });
+            }
         },
     );
     info!("Room message handler registered for command processing");
@@ -1,6 +1,105 @@
 use anyhow::Result;
 use async_trait::async_trait;
 use matrix_sdk::ruma::OwnedRoomId;
+use matrix_sdk::ruma::events::room::message::{MessageType, RoomMessageEventContent};
+
+/// Escape text for inclusion in an HTML message body
+pub fn escape_html(text: &str) -> String {
+    let mut escaped = String::with_capacity(text.len());
+    push_escaped_html(&mut escaped, text);
+    escaped
+}
+
+fn push_escaped_html(out: &mut String, text: &str) {
+    for c in text.chars() {
+        match c {
+            '&' => out.push_str("&amp;"),
+            '<' => out.push_str("&lt;"),
+            '>' => out.push_str("&gt;"),
+            '"' => out.push_str("&quot;"),
+            '\'' => out.push_str("&#39;"),
+            _ => out.push(c),
+        }
+    }
+}
+
+/// Builds a message's plain (Markdown-style) body and its HTML body in one
+/// pass, so each piece of a reply is written once instead of formatted twice.
+/// Text is HTML-escaped in the HTML body.
+#[derive(Debug, Default)]
+pub struct RichText {
+    plain: String,
+    html: String,
+}
+
+impl RichText {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Builder whose bodies can each hold `capacity` bytes before reallocating
+    pub fn with_capacity(capacity: usize) -> Self {
+        Self {
+            plain: String::with_capacity(capacity),
+            html: String::with_capacity(capacity),
+        }
+    }
+
+    pub fn text(mut self, text: &str) -> Self {
+        self.plain.push_str(text);
+        push_escaped_html(&mut self.html, text);
+        self
+    }
+
+    /// `**text**` / `<b>text</b>`
+    pub fn bold(mut self, text: &str) -> Self {
+        self.plain.push_str("**");
+        self.plain.push_str(text);
+        self.plain.push_str("**");
+        self.html.push_str("<b>");
+        push_escaped_html(&mut self.html, text);
+        self.html.push_str("</b>");
+        self
+    }
+
+    /// `` `text` `` / `<code>text</code>`
+    pub fn code(mut self, text: &str) -> Self {
+        self.plain.push('`');
+        self.plain.push_str(text);
+        self.plain.push('`');
+        self.html.push_str("<code>");
+        push_escaped_html(&mut self.html, text);
+        self.html.push_str("</code>");
+        self
+    }
+
+    /// Already rendered `(plain, html)` content, such as a task summary
+    pub fn rendered(mut self, plain: &str, html: &str) -> Self {
+        self.plain.push_str(plain);
+        self.html.push_str(html);
+        self
+    }
+
+    pub fn line_break(mut self) -> Self {
+        self.plain.push('\n');
+        self.html.push_str("<br>");
+        self
+    }
+
+    /// The finished `(plain, html)` bodies
+    pub fn finish(self) -> (String, String) {
+        (self.plain, self.html)
+    }
+}
+
+/// `write!` appends formatted text, escaped in the HTML body like [`RichText::text`]
+impl std::fmt::Write for RichText {
+    fn write_str(&mut self, text: &str) -> std::fmt::Result {
+        self.plain.push_str(text);
+        push_escaped_html(&mut self.html, text);
+        Ok(())
+    }
+}
 
 /// MessageSender trait provides an abstraction for sending messages to rooms
 /// This decouples the task management logic from matrix-specific implementation details
@@ -35,25 +134,33 @@ impl MatrixMessageSender {
     pub fn new(client: matrix_sdk::Client) -> Self {
         Self { client }
     }
-}
 
-#[async_trait]
-impl MessageSender for MatrixMessageSender {
-    async fn send_text_message(&self, room_id: &OwnedRoomId, message: &str) -> Result<()> {
+    /// Send already-built message content to a room
+    async fn send_content(
+        &self,
+        room_id: &OwnedRoomId,
+        content: RoomMessageEventContent,
+    ) -> Result<()> {
         let room = self
             .client
             .get_room(room_id)
             .ok_or_else(|| anyhow::anyhow!("Room not found"))?;
 
-        // Create a plain text message type
-        let content =
-            matrix_sdk::ruma::events::room::message::RoomMessageEventContent::notice_plain(message);
         room.send(content)
             .await
             .map_err(|e| anyhow::anyhow!("{:?}", e))?;
 
         Ok(())
     }
+}
+
+#[async_trait]
+impl MessageSender for MatrixMessageSender {
+    async fn send_text_message(&self, room_id: &OwnedRoomId, message: &str) -> Result<()> {
+        // Create a plain text message type
+        let content = RoomMessageEventContent::notice_plain(message);
+        self.send_content(room_id, content).await
+    }
 
     async fn send_formatted_message(
         &self,
@@ -61,24 +168,9 @@ impl MessageSender for MatrixMessageSender {
         text: &str,
         html: &str,
     ) -> Result<()> {
-        let room = self
-            .client
-            .get_room(room_id)
-            .ok_or_else(|| anyhow::anyhow!("Room not found"))?;
-
         // Create HTML formatted message content
-        let content_type = matrix_sdk::ruma::events::room::message::MessageType::notice_html(
-            text.to_string(),
-            html.to_string(),
-        );
-        let content =
-            matrix_sdk::ruma::events::room::message::RoomMessageEventContent::new(content_type);
-
-        room.send(content)
-            .await
-            .map_err(|e| anyhow::anyhow!("{:?}", e))?;
-
-        Ok(())
+        let content = RoomMessageEventContent::new(MessageType::notice_html(text, html));
+        self.send_content(room_id, content).await
     }
 
     async fn send_response(
@@ -87,10 +179,11 @@ impl MessageSender for MatrixMessageSender {
         message: &str,
         html_message: Option<String>,
     ) -> Result<()> {
-        if let Some(html) = html_message {
-            self.send_formatted_message(room_id, message, &html).await
-        } else {
-            self.send_text_message(room_id, message).await
-        }
+        let content = match html_message {
+            // Move the caller's HTML into the event rather than copying it again
+            Some(html) => RoomMessageEventContent::notice_html(message, html),
+            None => RoomMessageEventContent::notice_plain(message),
+        };
+        self.send_content(room_id, content).await
     }
 }
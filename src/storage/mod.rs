@@ -1,26 +1,75 @@
 use anyhow::{Context, Result};
 use chrono::Utc;
 use matrix_sdk::ruma::OwnedRoomId;
+use once_cell::sync::Lazy;
 use regex::Regex;
 use serde::{Deserialize, Serialize};
-use std::{collections::HashMap, path::PathBuf, sync::Arc};
-use tokio::sync::Mutex;
+use std::sync::atomic::{AtomicU64, Ordering as AtomicOrdering};
+use std::{
+    cmp::Ordering,
+    collections::HashMap,
+    fs::File,
+    io::Write,
+    ops::Range,
+    path::{Path, PathBuf},
+    sync::Arc,
+    time::Duration,
+};
+use tokio::sync::{Mutex, Notify};
 use tracing::{debug, error, info, warn};
 use uuid::Uuid;
 
 use crate::task_management::Task;
 
+/// How long the flush loop waits after the first change before writing, so
+/// a burst of commands results in a single save
+const SAVE_INTERVAL: Duration = Duration::from_secs(1);
+
+const SAVE_FILENAME_PREFIX: &str = concat!(env!("CARGO_PKG_NAME"), "_");
+const SAVE_FILENAME_SUFFIX: &str = "Z.json";
+/// `strftime` layout of the timestamp between the session ID and the suffix
+const SAVE_TIMESTAMP_FORMAT: &str = "%Y-%m-%d_%H-%M-%S";
+/// Ends the name of a save file's temporary copy while it is being written
+const SAVE_TMP_SUFFIX: &str = ".tmp";
+
+/// Save file names: `<app>_<session uuid>_<YYYY-MM-DD_HH-MM-SS>Z.json`.
+/// Any session is accepted so state saved by a previous run can be loaded.
+static SAVE_FILENAME_RE: Lazy<Regex> = Lazy::new(|| {
+    Regex::new(&format!(
+        r"^{}_[0-9a-f-]{{36}}_([0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}_[0-9]{{2}}-[0-9]{{2}}-[0-9]{{2}})Z\.json$",
+        regex::escape(env!("CARGO_PKG_NAME"))
+    ))
+    .expect("save filename pattern is a valid regex")
+});
+
 #[derive(Debug, Serialize, Deserialize, Clone)]
 pub struct StorageData {
     pub todo_lists: HashMap<OwnedRoomId, Vec<Task>>,
 }
 
+/// Borrowed view of [`StorageData`], serialized on save so the in-memory
+/// lists never have to be cloned just to be written out
+#[derive(Serialize)]
+struct StorageDataRef<'a> {
+    todo_lists: &'a HashMap<OwnedRoomId, Vec<Task>>,
+}
+
 #[derive(Debug, Clone)]
 pub struct StorageManager {
     pub data_dir: PathBuf,
     pub session_id: Uuid,
     pub todo_lists: Arc<Mutex<HashMap<OwnedRoomId, Vec<Task>>>>,
-    pub filename_pattern: Regex,
+    /// `<app>_<session uuid>_`, fixed for the session so saves only append the time
+    filename_prefix: String,
+    /// Number of changes made so far, and how many of them the last
+    /// completed save included; they differ while changes are unsaved
+    changes: Arc<AtomicU64>,
+    saved_changes: Arc<AtomicU64>,
+    changed: Arc<Notify>,
+    /// Held by `save` from taking the snapshot until its file is renamed into
+    /// place, so saves land on disk in the order their snapshots were taken
+    save_lock: Arc<Mutex<()>>,
+    write_buf: Arc<std::sync::Mutex<Vec<u8>>>,
 }
 
 impl StorageManager {
@@ -29,29 +78,72 @@ impl StorageManager {
             std::fs::create_dir_all(&data_dir)
                 .with_context(|| format!("Failed to create data directory: {:?}", data_dir))?;
         }
-        let filename_pattern = Regex::new(&format!(
-            r"^{}_{}_[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}_[0-9]{{2}}-[0-9]{{2}}-[0-9]{{2}}Z\\.json$",
-            regex::escape(env!("CARGO_PKG_NAME")),
-            regex::escape(&session_id.to_string())
-        ))?;
         Ok(Self {
             data_dir,
             session_id,
             todo_lists: Arc::new(Mutex::new(HashMap::new())),
-            filename_pattern,
+            filename_prefix: format!("{}{}_", SAVE_FILENAME_PREFIX, session_id),
+            changes: Arc::new(AtomicU64::new(0)),
+            saved_changes: Arc::new(AtomicU64::new(0)),
+            changed: Arc::new(Notify::new()),
+            save_lock: Arc::new(Mutex::new(())),
+            write_buf: Arc::new(std::sync::Mutex::new(Vec::new())),
         })
     }
 
+    /// Flag the todo lists as changed; the flush loop will persist them.
+    /// Call it while still holding the `todo_lists` lock used for the change.
+    pub fn mark_dirty(&self) {
+        self.changes.fetch_add(1, AtomicOrdering::SeqCst);
+        self.changed.notify_one();
+    }
+
+    pub fn has_unsaved_changes(&self) -> bool {
+        self.changes.load(AtomicOrdering::SeqCst) != self.saved_changes.load(AtomicOrdering::SeqCst)
+    }
+
+    /// Save only if something changed since the last completed save
+    pub async fn flush(&self) -> Result<()> {
+        if self.has_unsaved_changes() {
+            self.save().await?;
+        }
+        Ok(())
+    }
+
+    /// Persist pending changes, coalescing everything marked dirty within
+    /// `SAVE_INTERVAL` into one save. Runs for the lifetime of the bot.
+    pub async fn run_flush_loop(self: Arc<Self>) {
+        loop {
+            self.changed.notified().await;
+            tokio::time::sleep(SAVE_INTERVAL).await;
+            // Changes made during the sleep leave a wakeup behind; if this save
+            // already covered them, that wakeup finds nothing to flush
+            if let Err(e) = self.flush().await {
+                error!(
+                    session_id = %self.session_id,
+                    error = %e,
+                    "Failed to flush pending task list changes"
+                );
+                // Keep the changes pending: retry after the next interval
+                // instead of waiting for another mutation
+                self.changed.notify_one();
+            }
+        }
+    }
+
     pub async fn save(&self) -> Result<String> {
         debug!(session_id = %self.session_id, "Starting task storage save operation");
 
+        let _save_guard = self.save_lock.lock().await;
         let todo_lists = self.todo_lists.lock().await;
+        // Changes are counted under the same lock, so this is exactly what gets serialized
+        let saving_changes = self.changes.load(AtomicOrdering::SeqCst);
         let current_time = Utc::now();
         let filename = format!(
-            "{}_{}_{}.json",
-            env!("CARGO_PKG_NAME"),
-            self.session_id,
-            current_time.format("%Y-%m-%d_%H-%M-%SZ")
+            "{}{}{}",
+            self.filename_prefix,
+            current_time.format(SAVE_TIMESTAMP_FORMAT),
+            SAVE_FILENAME_SUFFIX
         );
         let filepath = self.data_dir.join(&filename);
 
@@ -68,24 +160,47 @@ impl StorageManager {
             "Saving todo lists to file"
         );
 
-        let data = StorageData {
-            todo_lists: todo_lists.clone(),
+        let data = StorageDataRef {
+            todo_lists: &todo_lists,
         };
 
-        let json_data = match serde_json::to_string_pretty(&data) {
-            Ok(json) => json,
-            Err(e) => {
-                error!(
-                    session_id = %self.session_id,
-                    error = %e,
-                    "Failed to serialize task data to JSON"
-                );
-                return Err(e.into());
-            }
-        };
+        // Serialize into the buffer kept from the previous save so its allocation is reused
+        let mut json_data =
+            std::mem::take(&mut *self.write_buf.lock().unwrap_or_else(|e| e.into_inner()));
+        json_data.clear();
+        if let Err(e) = serde_json::to_writer(&mut json_data, &data) {
+            error!(
+                session_id = %self.session_id,
+                error = %e,
+                "Failed to serialize task data to JSON"
+            );
+            return Err(e.into());
+        }
+
+        // The serialized payload is all we need; let commands proceed while the file is written
+        drop(todo_lists);
+
+        // Write beside the target and rename into place, so a crash mid-write never
+        // leaves a truncated save that loadlast would pick up. Names only have
+        // one-second resolution, so each save gets its own temporary file.
+        let write_path = filepath.clone();
+        let tmp_path = self.data_dir.join(format!(
+            "{}.{}{}",
+            filename,
+            Uuid::new_v4(),
+            SAVE_TMP_SUFFIX
+        ));
+        let (json_data, write_result) = tokio::task::spawn_blocking(move || {
+            let result = write_file_atomic(&tmp_path, &write_path, &json_data);
+            (json_data, result)
+        })
+        .await?;
+        *self.write_buf.lock().unwrap_or_else(|e| e.into_inner()) = json_data;
 
-        match tokio::fs::write(&filepath, json_data).await {
+        match write_result {
             Ok(_) => {
+                self.saved_changes
+                    .fetch_max(saving_changes, AtomicOrdering::SeqCst);
                 info!(
                     session_id = %self.session_id,
                     file_name = %filename,
@@ -116,12 +231,12 @@ impl StorageManager {
         debug!(session_id = %self.session_id, filename, "Starting task storage load operation");
 
         let filepath = self.data_dir.join(filename);
-        if !filepath.exists() {
+        if !tokio::fs::try_exists(&filepath).await.unwrap_or(false) {
             warn!(session_id = %self.session_id, file_path = %filepath.display(), "Attempted to load non-existent file");
             return Ok(false);
         }
 
-        if !self.filename_pattern.is_match(filename) {
+        if parse_save_filename(filename).is_none() {
             warn!(
                 session_id = %self.session_id,
                 filename,
@@ -132,31 +247,38 @@ impl StorageManager {
 
         info!(session_id = %self.session_id, file_path = %filepath.display(), "Loading task data from file");
 
-        let file_content = match tokio::fs::read_to_string(&filepath).await {
-            Ok(content) => content,
-            Err(e) => {
-                error!(
-                    session_id = %self.session_id,
-                    file_path = %filepath.display(),
-                    error = %e,
-                    "Failed to read task data file"
-                );
-                return Err(e.into());
-            }
-        };
+        // Reading and parsing a large save is CPU and disk bound, so both run
+        // on the blocking pool instead of an async worker thread
+        let read_path = filepath.clone();
+        let session_id = self.session_id;
+        let data = tokio::task::spawn_blocking(move || -> Result<StorageData> {
+            let file_content = match std::fs::read(&read_path) {
+                Ok(content) => content,
+                Err(e) => {
+                    error!(
+                        session_id = %session_id,
+                        file_path = %read_path.display(),
+                        error = %e,
+                        "Failed to read task data file"
+                    );
+                    return Err(e.into());
+                }
+            };
 
-        let data: StorageData = match serde_json::from_str(&file_content) {
-            Ok(parsed) => parsed,
-            Err(e) => {
-                error!(
-                    session_id = %self.session_id,
-                    file_path = %filepath.display(),
-                    error = %e,
-                    "Failed to parse task data from JSON"
-                );
-                return Err(e.into());
+            match serde_json::from_slice(&file_content) {
+                Ok(parsed) => Ok(parsed),
+                Err(e) => {
+                    error!(
+                        session_id = %session_id,
+                        file_path = %read_path.display(),
+                        error = %e,
+                        "Failed to parse task data from JSON"
+                    );
+                    Err(e.into())
+                }
             }
-        };
+        })
+        .await??;
 
         let mut todo_lists = self.todo_lists.lock().await;
         *todo_lists = data.todo_lists;
@@ -177,10 +299,53 @@ impl StorageManager {
         Ok(true)
     }
 
-    pub fn list_saved_files(&self) -> Result<Vec<String>> {
-        debug!(session_id = %self.session_id, data_dir = %self.data_dir.display(), "Listing saved task files");
+    /// List valid save files, oldest first. The directory scan runs on the
+    /// blocking thread pool so it never stalls the event loop.
+    pub async fn list_saved_files(&self) -> Result<Vec<String>> {
+        let storage = self.clone();
+        tokio::task::spawn_blocking(move || storage.list_saved_files_blocking()).await?
+    }
+
+    /// Most recent valid save file, found in a single directory pass
+    /// without collecting or sorting the listing
+    pub async fn latest_saved_file(&self) -> Result<Option<String>> {
+        let storage = self.clone();
+        tokio::task::spawn_blocking(move || storage.latest_saved_file_blocking()).await?
+    }
 
+    fn list_saved_files_blocking(&self) -> Result<Vec<String>> {
         let mut valid_files = Vec::new();
+        self.scan_saved_files(|file| valid_files.push(file))?;
+
+        valid_files.sort_unstable_by(cmp_save_files);
+        let valid_files: Vec<String> = valid_files.into_iter().map(|(_, name)| name).collect();
+
+        info!(
+            session_id = %self.session_id,
+            file_count = valid_files.len(),
+            "Found valid task files"
+        );
+
+        Ok(valid_files)
+    }
+
+    fn latest_saved_file_blocking(&self) -> Result<Option<String>> {
+        let mut latest: Option<(Range<usize>, String)> = None;
+        self.scan_saved_files(|file| {
+            if latest
+                .as_ref()
+                .is_none_or(|best| cmp_save_files(&file, best).is_gt())
+            {
+                latest = Some(file);
+            }
+        })?;
+        Ok(latest.map(|(_, name)| name))
+    }
+
+    /// Call `visit` with each valid save file in the data directory, along
+    /// with where its timestamp sits so ordering needs no second parse
+    fn scan_saved_files(&self, mut visit: impl FnMut((Range<usize>, String))) -> Result<()> {
+        debug!(session_id = %self.session_id, data_dir = %self.data_dir.display(), "Listing saved task files");
 
         let read_dir_result = match std::fs::read_dir(&self.data_dir) {
             Ok(entries) => entries,
@@ -208,31 +373,147 @@ impl StorageManager {
                 }
             };
 
-            let path = entry.path();
-            if path.is_file() {
-                if let Some(filename) = path.file_name().and_then(|s| s.to_str()) {
-                    if self.filename_pattern.is_match(filename) {
-                        debug!(file_name = %filename, "Found valid task file");
-                        valid_files.push(filename.to_owned());
-                    } else {
-                        debug!(file_name = %filename, "Ignoring non-matching file");
-                    }
+            // The entry already carries its file type; Path::is_file would stat it again
+            if !entry.file_type().is_ok_and(|t| t.is_file()) {
+                continue;
+            }
+            let Ok(filename) = entry.file_name().into_string() else {
+                continue;
+            };
+
+            match save_timestamp_range(&filename) {
+                Some(timestamp) => {
+                    debug!(file_name = %filename, "Found valid task file");
+                    visit((timestamp, filename));
                 }
+                None => debug!(file_name = %filename, "Ignoring non-matching file"),
             }
         }
 
-        valid_files.sort_by(|a, b| {
-            let a_timestamp = a.chars().rev().skip(5).take(19).collect::<String>();
-            let b_timestamp = b.chars().rev().skip(5).take(19).collect::<String>();
-            a_timestamp.cmp(&b_timestamp)
-        });
+        Ok(())
+    }
+}
 
-        info!(
-            session_id = %self.session_id,
-            file_count = valid_files.len(),
-            "Found valid task files"
+/// Write `data` to `tmp_path`, flush it to disk and rename it to `path`.
+/// The temporary file is removed if any step fails.
+fn write_file_atomic(tmp_path: &Path, path: &Path, data: &[u8]) -> std::io::Result<()> {
+    let result = File::create(tmp_path)
+        .and_then(|mut file| {
+            file.write_all(data)?;
+            file.sync_all()
+        })
+        .and_then(|()| std::fs::rename(tmp_path, path));
+    if result.is_err() {
+        let _ = std::fs::remove_file(tmp_path);
+    }
+    result
+}
+
+/// Order save files by timestamp, then by name for saves within the same second
+fn cmp_save_files(
+    (ts_a, a): &(Range<usize>, String),
+    (ts_b, b): &(Range<usize>, String),
+) -> Ordering {
+    a[ts_a.clone()].cmp(&b[ts_b.clone()]).then_with(|| a.cmp(b))
+}
+
+/// Validate a save filename and return its `YYYY-MM-DD_HH-MM-SS` timestamp
+pub fn parse_save_filename(filename: &str) -> Option<&str> {
+    save_timestamp_range(filename).map(|range| &filename[range])
+}
+
+/// Byte range of the timestamp in a valid save filename. Cheap prefix and
+/// suffix checks reject unrelated names before the regex runs.
+fn save_timestamp_range(filename: &str) -> Option<Range<usize>> {
+    if !filename.starts_with(SAVE_FILENAME_PREFIX) || !filename.ends_with(SAVE_FILENAME_SUFFIX) {
+        return None;
+    }
+    SAVE_FILENAME_RE
+        .captures(filename)
+        .and_then(|caps| caps.get(1))
+        .map(|ts| ts.range())
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn save_name(session_id: &str, timestamp: &str) -> String {
+        format!(
+            "{}{}_{}{}",
+            SAVE_FILENAME_PREFIX, session_id, timestamp, SAVE_FILENAME_SUFFIX
+        )
+    }
+
+    fn save_file(session_id: &str, timestamp: &str) -> (Range<usize>, String) {
+        let name = save_name(session_id, timestamp);
+        (save_timestamp_range(&name).unwrap(), name)
+    }
+
+    const SESSION_A: &str = "00000000-0000-0000-0000-00000000000a";
+    const SESSION_F: &str = "ffffffff-ffff-ffff-ffff-fffffffffff0";
+
+    #[test]
+    fn parses_valid_save_filename() {
+        let name = save_name(SESSION_A, "2024-05-06_07-08-09");
+        assert_eq!(parse_save_filename(&name), Some("2024-05-06_07-08-09"));
+
+        let session_id = Uuid::new_v4();
+        let name = format!(
+            "{}{}_{}{}",
+            SAVE_FILENAME_PREFIX,
+            session_id,
+            Utc::now().format(SAVE_TIMESTAMP_FORMAT),
+            SAVE_FILENAME_SUFFIX
         );
+        assert!(parse_save_filename(&name).is_some());
+    }
 
-        Ok(valid_files)
+    #[test]
+    fn rejects_invalid_save_filenames() {
+        let valid = save_name(SESSION_A, "2024-05-06_07-08-09");
+        for name in [
+            String::new(),
+            "notes.json".to_owned(),
+            valid.replacen(SAVE_FILENAME_PREFIX, "other_", 1),
+            valid.replace("Z.json", ".json"),
+            format!("{}{}", valid, SAVE_TMP_SUFFIX),
+            format!("{}.{}{}", valid, Uuid::new_v4(), SAVE_TMP_SUFFIX),
+            save_name("not-a-uuid", "2024-05-06_07-08-09"),
+            save_name(SESSION_A, "2024-05-06 07:08:09"),
+            save_name(SESSION_A, "24-05-06_07-08-09"),
+            format!("../{}", valid),
+        ] {
+            assert_eq!(parse_save_filename(&name), None, "{:?}", name);
+        }
+    }
+
+    #[test]
+    fn orders_save_files_by_timestamp_then_name() {
+        let mut files = vec![
+            save_file(SESSION_A, "2024-05-06_07-08-10"),
+            save_file(SESSION_F, "2024-05-06_07-08-09"),
+            save_file(SESSION_A, "2023-12-31_23-59-59"),
+            save_file(SESSION_A, "2024-05-06_07-08-09"),
+        ];
+        files.sort_by(cmp_save_files);
+
+        let names: Vec<&str> = files.iter().map(|(_, name)| name.as_str()).collect();
+        assert_eq!(
+            names,
+            [
+                save_name(SESSION_A, "2023-12-31_23-59-59"),
+                save_name(SESSION_A, "2024-05-06_07-08-09"),
+                save_name(SESSION_F, "2024-05-06_07-08-09"),
+                save_name(SESSION_A, "2024-05-06_07-08-10"),
+            ]
+        );
+        assert_eq!(
+            files
+                .iter()
+                .max_by(|a, b| cmp_save_files(a, b))
+                .map(|(_, n)| n),
+            Some(&save_name(SESSION_A, "2024-05-06_07-08-10"))
+        );
     }
 }
@@ -1,11 +1,65 @@
 use chrono::Utc;
 use matrix_sdk::ruma::OwnedRoomId;
-use serde::{Deserialize, Serialize};
-use std::sync::Arc;
-use tracing::{debug, error, info, instrument, warn};
+use once_cell::sync::Lazy;
+use serde::{Deserialize, Deserializer, Serialize};
+use std::collections::{BTreeMap, HashSet, VecDeque};
+use std::fmt::Write;
+use std::sync::{Arc, Mutex, OnceLock};
+use tracing::{debug, info, instrument, warn};
+
+/// Last formatted history timestamp, keyed by the unix second it represents
+static LAST_TIMESTAMP: Mutex<(i64, String)> = Mutex::new((i64::MIN, String::new()));
+
+/// Current history timestamp; formatted at most once per second
+fn now_timestamp() -> String {
+    let now = Utc::now();
+    let secs = now.timestamp();
+    let mut last = LAST_TIMESTAMP.lock().unwrap_or_else(|e| e.into_inner());
+    if last.0 != secs {
+        *last = (secs, now.format("%Y-%m-%d %H:%M:%S").to_string());
+    }
+    last.1.clone()
+}
+
+/// Every user ID seen in task history; a room has few distinct users but
+/// many history entries, so each entry shares one allocation per user
+static USER_IDS: Lazy<Mutex<HashSet<Arc<str>>>> = Lazy::new(Default::default);
+
+/// Shared copy of `user`, allocated only the first time it is seen
+fn intern_user(user: &str) -> Arc<str> {
+    let mut users = USER_IDS.lock().unwrap_or_else(|e| e.into_inner());
+    if let Some(interned) = users.get(user) {
+        return interned.clone();
+    }
+    let interned: Arc<str> = Arc::from(user);
+    users.insert(interned.clone());
+    interned
+}
+
+fn deserialize_user<'de, D: Deserializer<'de>>(deserializer: D) -> Result<Arc<str>, D::Error> {
+    let user = String::deserialize(deserializer)?;
+    Ok(intern_user(&user))
+}
+
+/// Maximum number of characters of a title or log quoted in history entries
+const PREVIEW_LEN: usize = 30;
+
+/// Quoted preview of `text` for history entries, cut to `PREVIEW_LEN` characters
+fn preview(text: &str) -> String {
+    match text.char_indices().nth(PREVIEW_LEN) {
+        Some((end, _)) => format!("'{}...'", &text[..end]),
+        None => format!("'{}'", text),
+    }
+}
+
+/// Rough size of one `!list` line, used to size the reply up front
+const LIST_LINE_CAPACITY: usize = 48;
+
+/// Maximum number of history entries kept per task; older ones are only counted
+const MAX_HISTORY: usize = 200;
 
 // --- TaskEvent Constants ---
-#[derive(Debug, Serialize, Deserialize, Clone)]
+#[derive(Debug, Serialize, Deserialize, Clone, Copy, PartialEq, Eq, PartialOrd, Ord)]
 pub enum TaskEvent {
     Created,
     StatusUpdated,
@@ -14,6 +68,13 @@ pub enum TaskEvent {
 }
 
 impl TaskEvent {
+    const ALL: [TaskEvent; 4] = [
+        TaskEvent::Created,
+        TaskEvent::StatusUpdated,
+        TaskEvent::LogAdded,
+        TaskEvent::TitleEdited,
+    ];
+
     pub fn to_string_readable(&self) -> &str {
         match self {
             TaskEvent::Created => "Created task",
@@ -22,6 +83,149 @@ impl TaskEvent {
             TaskEvent::TitleEdited => "Edited title",
         }
     }
+
+    /// Recover the event from a rendered history action; events are not saved
+    fn from_action(action: &str) -> Self {
+        Self::ALL
+            .into_iter()
+            .find(|event| action.starts_with(event.to_string_readable()))
+            .unwrap_or(TaskEvent::LogAdded)
+    }
+}
+
+// --- TaskStatus Enum ---
+/// Task state, saved as its lowercase name
+#[derive(Debug, Serialize, Deserialize, Clone, Copy, PartialEq, Eq)]
+#[serde(rename_all = "lowercase")]
+pub enum TaskStatus {
+    Pending,
+    Done,
+    Closed,
+}
+
+impl TaskStatus {
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            TaskStatus::Pending => "pending",
+            TaskStatus::Done => "done",
+            TaskStatus::Closed => "closed",
+        }
+    }
+}
+
+impl std::fmt::Display for TaskStatus {
+    fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
+        f.write_str(self.as_str())
+    }
+}
+
+// --- InternalLogs Struct ---
+/// Task history stored column-wise (one vector per field) rather than as a
+/// vector of `(timestamp, user, action)` tuples. Only the newest
+/// `MAX_HISTORY` entries are kept; dropped ones are counted per event.
+#[derive(Debug, Serialize, Deserialize, Clone, Default)]
+#[serde(from = "InternalLogsRepr")]
+pub struct InternalLogs {
+    pub timestamps: VecDeque<String>,
+    pub users: VecDeque<Arc<str>>,
+    /// Kept in memory only; each event is the prefix of its action and is
+    /// recovered from it on load
+    #[serde(skip_serializing)]
+    pub events: VecDeque<TaskEvent>,
+    pub actions: VecDeque<String>,
+    #[serde(skip_serializing_if = "BTreeMap::is_empty")]
+    pub truncated: BTreeMap<TaskEvent, usize>,
+}
+
+/// On-disk forms of the history: the current columns, or the legacy list of tuples
+#[derive(Deserialize)]
+#[serde(untagged)]
+enum InternalLogsRepr {
+    Columns {
+        timestamps: Vec<String>,
+        users: Vec<String>,
+        actions: Vec<String>,
+        #[serde(default)]
+        truncated: BTreeMap<TaskEvent, usize>,
+    },
+    Rows(Vec<(String, String, String)>),
+}
+
+impl From<InternalLogsRepr> for InternalLogs {
+    fn from(repr: InternalLogsRepr) -> Self {
+        let mut logs = Self::default();
+        match repr {
+            InternalLogsRepr::Columns {
+                timestamps,
+                users,
+                actions,
+                truncated,
+            } => {
+                logs.truncated = truncated;
+                for ((timestamp, user), action) in timestamps.into_iter().zip(users).zip(actions) {
+                    let event = TaskEvent::from_action(&action);
+                    logs.push(timestamp, intern_user(&user), event, action);
+                }
+            }
+            InternalLogsRepr::Rows(rows) => {
+                for (timestamp, user, action) in rows {
+                    let event = TaskEvent::from_action(&action);
+                    logs.push(timestamp, intern_user(&user), event, action);
+                }
+            }
+        }
+        logs
+    }
+}
+
+impl InternalLogs {
+    pub fn push(&mut self, timestamp: String, user: Arc<str>, event: TaskEvent, action: String) {
+        self.timestamps.push_back(timestamp);
+        self.users.push_back(user);
+        self.events.push_back(event);
+        self.actions.push_back(action);
+
+        if self.len() > MAX_HISTORY {
+            self.timestamps.pop_front();
+            self.users.pop_front();
+            self.actions.pop_front();
+            if let Some(dropped) = self.events.pop_front() {
+                *self.truncated.entry(dropped).or_default() += 1;
+            }
+        }
+    }
+
+    pub fn len(&self) -> usize {
+        self.timestamps.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.timestamps.is_empty()
+    }
+
+    /// Iterate entries as `(timestamp, user, action)`
+    pub fn iter(&self) -> impl Iterator<Item = (&str, &str, &str)> {
+        self.timestamps
+            .iter()
+            .zip(&self.users)
+            .zip(&self.actions)
+            .map(|((timestamp, user), action)| (timestamp.as_str(), &**user, action.as_str()))
+    }
+
+    /// One-line account of entries dropped by the history cap, if any
+    pub fn truncated_summary(&self) -> Option<String> {
+        if self.truncated.is_empty() {
+            return None;
+        }
+        let total: usize = self.truncated.values().sum();
+        let counts = self
+            .truncated
+            .iter()
+            .map(|(event, count)| format!("{}× {}", count, event.to_string_readable()))
+            .collect::<Vec<String>>()
+            .join(", ");
+        Some(format!("(+{} older entries: {})", total, counts))
+    }
 }
 
 // --- Task Struct ---
@@ -29,21 +233,27 @@ impl TaskEvent {
 pub struct Task {
     pub id: usize,
     pub title: String,
-    pub status: String,
+    pub status: TaskStatus,
     pub logs: Vec<String>,
-    pub internal_logs: Vec<(String, String, String)>, // (timestamp, user, log)
-    pub creator: String,
+    pub internal_logs: InternalLogs,
+    #[serde(deserialize_with = "deserialize_user")]
+    pub creator: Arc<str>,
+    /// `(plain, html)` summary line, rendered on first use and reset when
+    /// the title or status changes
+    #[serde(skip)]
+    rendered: OnceLock<(String, String)>,
 }
 
 impl Task {
-    pub fn new(sender: String, id: usize, title: String) -> Self {
+    pub fn new(sender: &str, id: usize, title: String) -> Self {
         let mut task = Task {
             id,
             title,
-            status: "pending".to_owned(),
+            status: TaskStatus::Pending,
             logs: Vec::new(),
-            internal_logs: Vec::new(),
-            creator: sender.clone(),
+            internal_logs: InternalLogs::default(),
+            creator: intern_user(sender),
+            rendered: OnceLock::new(),
         };
         task.add_internal_log(sender, TaskEvent::Created, None);
         task
@@ -51,32 +261,29 @@ impl Task {
 
     pub fn add_internal_log(
         &mut self,
-        sender: String,
+        sender: &str,
         event_type: TaskEvent,
         extra_info: Option<String>,
     ) {
-        let timestamp = Utc::now().format("%Y-%m-%d %H:%M:%S").to_string();
-        let user = sender;
+        let timestamp = now_timestamp();
+        let user = intern_user(sender);
         let action = match extra_info {
             Some(info) => format!("{}: {}", event_type.to_string_readable(), info),
             None => event_type.to_string_readable().to_owned(),
         };
-        self.internal_logs.push((timestamp, user, action));
+        self.internal_logs.push(timestamp, user, event_type, action);
     }
 
-    pub fn add_log(&mut self, sender: String, log: String) {
-        self.logs.push(log.clone());
-        let truncated_log = if log.len() > 30 {
-            format!("'{}...'", &log[..30])
-        } else {
-            format!("'{}'", log)
-        };
+    pub fn add_log(&mut self, sender: &str, log: String) {
+        let truncated_log = preview(&log);
+        self.logs.push(log);
         self.add_internal_log(sender, TaskEvent::LogAdded, Some(truncated_log));
     }
 
-    pub fn set_status(&mut self, sender: String, status: String) {
-        let old_status = self.status.clone();
-        self.status = status.clone();
+    pub fn set_status(&mut self, sender: &str, status: TaskStatus) {
+        let old_status = self.status;
+        self.status = status;
+        self.rendered.take();
         self.add_internal_log(
             sender,
             TaskEvent::StatusUpdated,
@@ -84,54 +291,65 @@ impl Task {
         );
     }
 
-    pub fn set_title(&mut self, sender: String, title: String) {
-        let old_title = self.title.clone();
-        self.title = title.clone();
-        let truncated_old_title = if old_title.len() > 30 {
-            format!("'{}...'", &old_title[..30])
-        } else {
-            format!("'{}'", old_title)
-        };
-        let truncated_new_title = if title.len() > 30 {
-            format!("'{}...'", &title[..30])
-        } else {
-            format!("'{}'", title)
-        };
-        self.add_internal_log(
-            sender,
-            TaskEvent::TitleEdited,
-            Some(format!(
-                "from {} to {}",
-                truncated_old_title, truncated_new_title
-            )),
-        );
+    pub fn set_title(&mut self, sender: &str, title: String) {
+        let change = format!("from {} to {}", preview(&self.title), preview(&title));
+        self.title = title;
+        self.rendered.take();
+        self.add_internal_log(sender, TaskEvent::TitleEdited, Some(change));
     }
 
-    pub fn show_details(&self) -> String {
-        let mut details = vec![format!("**[{}] {}**", self.status, self.title)];
-        details.push(format!("Created by: {}", self.creator));
+    /// Render the task details as `(plain, html)` in a single pass over its logs
+    pub fn show_details(&self) -> (String, String) {
+        let (summary, html_summary) = self.summary();
+        let mut text = RichText::new()
+            .rendered(summary, html_summary)
+            .line_break()
+            .text("Created by: ")
+            .text(&self.creator);
 
         if !self.logs.is_empty() {
-            details.push("\n**Logs:**".to_owned());
+            text = text.line_break().line_break().bold("Logs:");
             for (i, log) in self.logs.iter().enumerate() {
-                details.push(format!("{}. {}", i + 1, log));
+                text = text.line_break();
+                let _ = write!(text, "{}. {}", i + 1, log);
             }
         }
 
         if !self.internal_logs.is_empty() {
-            details.push("\n**History:**".to_owned());
-            for (timestamp, user, action) in &self.internal_logs {
-                details.push(format!("• {} - {}: {}", timestamp, user, action));
+            text = text.line_break().line_break().bold("History:");
+            if let Some(summary) = self.internal_logs.truncated_summary() {
+                text = text.line_break().text(&summary);
+            }
+            for (timestamp, user, action) in self.internal_logs.iter() {
+                text = text.line_break();
+                let _ = write!(text, "• {} - {}: {}", timestamp, user, action);
             }
         }
-        details.join("\n")
+        text.finish()
     }
 
-    pub fn to_string_short(&self) -> String {
-        format!("**[{}] {}**", self.status, self.title)
+    /// `(plain, html)` one-line summary such as `**[pending] Title**`; the
+    /// HTML variant escapes the user-supplied title
+    pub fn summary(&self) -> &(String, String) {
+        self.rendered.get_or_init(|| {
+            (
+                format!("**[{}] {}**", self.status, self.title),
+                format!("<b>[{}] {}</b>", self.status, escape_html(&self.title)),
+            )
+        })
     }
 }
 
+/// Task shown as `task_number` (1-based) in `!list`; task numbers are
+/// positions in the room's list, so this is a direct index
+fn nth_task(tasks: &[Task], task_number: usize) -> Option<&Task> {
+    task_number.checked_sub(1).and_then(|i| tasks.get(i))
+}
+
+fn nth_task_mut(tasks: &mut [Task], task_number: usize) -> Option<&mut Task> {
+    task_number.checked_sub(1).and_then(|i| tasks.get_mut(i))
+}
+
 // --- TodoList Struct ---
 #[derive(Clone)]
 pub struct TodoList {
@@ -139,7 +357,7 @@ pub struct TodoList {
     pub storage: Arc<StorageManager>,
 }
 
-use crate::messaging::MessageSender;
+use crate::messaging::{MessageSender, RichText, escape_html};
 use crate::storage::StorageManager;
 use anyhow::Result;
 
@@ -166,7 +384,7 @@ impl TodoList {
 
         // Get the next task ID and create a new task
         let next_id = room_tasks.len() + 1;
-        let task = Task::new(sender.clone(), next_id, task_title.clone());
+        let task = Task::new(&sender, next_id, task_title.clone());
 
         info!(
             user = %sender,
@@ -178,6 +396,8 @@ impl TodoList {
 
         // Add the task to the room's task list
         room_tasks.push(task);
+        debug!("Marking task list for saving");
+        self.storage.mark_dirty();
 
         // Prepare and send the response message
         let message = format!(
@@ -189,28 +409,12 @@ impl TodoList {
 
         debug!("Sending confirmation message to room");
         self.send_matrix_message(room_id, &message, None).await?;
-
-        debug!("Saving updated task list");
-        match self.storage.save().await {
-            Ok(_) => {
-                info!(
-                    user = %sender,
-                    room_id = %room_id,
-                    task_id = next_id,
-                    "Successfully added and saved new task"
-                );
-            }
-            Err(e) => {
-                error!(
-                    user = %sender,
-                    room_id = %room_id,
-                    task_id = next_id,
-                    error = %e,
-                    "Failed to save task list after adding task"
-                );
-                return Err(e);
-            }
-        }
+        info!(
+            user = %sender,
+            room_id = %room_id,
+            task_id = next_id,
+            "Successfully added new task"
+        );
 
         Ok(())
     }
@@ -220,19 +424,28 @@ impl TodoList {
         let tasks = todo_lists.get(room_id);
 
         if let Some(tasks) = tasks {
-            if tasks.is_empty() {
+            let mut text = RichText::with_capacity(tasks.len() * LIST_LINE_CAPACITY)
+                .text("📋 Room To-Do List:");
+            let mut listed = 0;
+            // Closed tasks keep their slot so task numbers stay stable, but aren't listed
+            for (idx, task) in tasks.iter().enumerate() {
+                if task.status == TaskStatus::Closed {
+                    continue;
+                }
+                let (summary, html_summary) = task.summary();
+                text = text.line_break();
+                let _ = write!(text, "{}. ", idx + 1);
+                text = text.rendered(summary, html_summary);
+                listed += 1;
+            }
+
+            if listed == 0 {
                 let message = "ℹ️ Info: There are no tasks in this room's to-do list.";
                 self.send_matrix_message(room_id, message, None).await?;
                 return Ok(());
             }
 
-            let mut response = String::new();
-            for (idx, task) in tasks.iter().enumerate() {
-                response.push_str(&format!("{}. {}\n", idx + 1, task.to_string_short()));
-            }
-
-            let message = format!("📋 Room To-Do List:\n{}", response);
-            let html_message = format!("📋 Room To-Do List:<br>{}", response.replace('\n', "<br>"));
+            let (message, html_message) = text.finish();
             self.send_matrix_message(room_id, &message, Some(html_message))
                 .await?;
         } else {
@@ -252,63 +465,54 @@ impl TodoList {
         debug!(user = %sender, "Starting mark task as done operation");
 
         let mut todo_lists = self.storage.todo_lists.lock().await;
-        let tasks = todo_lists.entry(room_id.clone()).or_default();
+        let task = todo_lists
+            .get_mut(room_id)
+            .and_then(|tasks| nth_task_mut(tasks, task_number));
 
-        if task_number > 0 && task_number <= tasks.len() {
-            let task = &mut tasks[task_number - 1];
-            let task_title = task.title.clone();
+        match task {
+            Some(task) if task.status == TaskStatus::Closed => {
+                self.send_closed_task_error(room_id, task_number).await?;
+            }
+            Some(task) => {
+                let task_title = task.title.clone();
 
-            info!(
-                user = %sender,
-                room_id = %room_id,
-                task_id = task_number,
-                title = %task_title,
-                "Marking task as done"
-            );
+                info!(
+                    user = %sender,
+                    room_id = %room_id,
+                    task_id = task_number,
+                    title = %task_title,
+                    "Marking task as done"
+                );
 
-            task.set_status(sender.clone(), "done".to_string());
+                task.set_status(&sender, TaskStatus::Done);
+                debug!("Marking task list for saving");
+                self.storage.mark_dirty();
 
-            let message = format!("✅ Task {} marked as done: **{}**", task_number, task.title);
-            let html_message = format!(
-                "✅ Task {} marked as done: <b>{}</b>",
-                task_number, task.title
-            );
+                let mut text = RichText::new();
+                let _ = write!(text, "✅ Task {} marked as done: ", task_number);
+                let (message, html_message) = text.bold(&task.title).finish();
 
-            debug!("Sending confirmation message to room");
-            self.send_matrix_message(room_id, &message, Some(html_message))
-                .await?;
+                debug!("Sending confirmation message to room");
+                self.send_matrix_message(room_id, &message, Some(html_message))
+                    .await?;
+                info!(
+                    user = %sender,
+                    room_id = %room_id,
+                    task_id = task_number,
+                    "Successfully marked task as done"
+                );
+            }
+            None => {
+                warn!(
+                    user = %sender,
+                    room_id = %room_id,
+                    task_id = task_number,
+                    "Attempted to mark non-existent task as done"
+                );
 
-            debug!("Saving updated task list");
-            match self.storage.save().await {
-                Ok(_) => {
-                    info!(
-                        user = %sender,
-                        room_id = %room_id,
-                        task_id = task_number,
-                        "Successfully saved task status change"
-                    );
-                }
-                Err(e) => {
-                    error!(
-                        user = %sender,
-                        room_id = %room_id,
-                        task_id = task_number,
-                        error = %e,
-                        "Failed to save task list after marking task as done"
-                    );
-                    return Err(e);
-                }
+                let message = format!("❌ Error: Task {} doesn't exist.", task_number);
+                self.send_matrix_message(room_id, &message, None).await?;
             }
-        } else {
-            warn!(
-                user = %sender,
-                room_id = %room_id,
-                task_id = task_number,
-                "Attempted to mark non-existent task as done"
-            );
-
-            let message = format!("❌ Error: Task {} doesn't exist.", task_number);
-            self.send_matrix_message(room_id, &message, None).await?;
         }
 
         Ok(())
@@ -330,21 +534,30 @@ impl TodoList {
                 return Ok(());
             }
 
-            if task_number > 0 && task_number <= tasks.len() {
-                let mut task = tasks.remove(task_number - 1);
-                task.set_status(sender, "closed".to_owned());
-
-                let message = format!("✖️ Task Closed: **{}**", task.to_string_short());
-                let html_message = format!("✖️ Task Closed: <b>{}</b>", task.to_string_short());
-                self.send_matrix_message(room_id, &message, Some(html_message))
-                    .await?;
-                self.storage.save().await?;
-            } else {
-                let message = format!(
-                    "❌ Error: Invalid task number: {}. Use `!list` to see valid numbers.",
-                    task_number
-                );
-                self.send_matrix_message(room_id, &message, None).await?;
+            // Close in place: removing would shift and renumber every later task
+            match nth_task_mut(tasks, task_number) {
+                Some(task) if task.status == TaskStatus::Closed => {
+                    self.send_closed_task_error(room_id, task_number).await?;
+                }
+                Some(task) => {
+                    task.set_status(&sender, TaskStatus::Closed);
+                    self.storage.mark_dirty();
+
+                    let (summary, html_summary) = task.summary();
+                    let (message, html_message) = RichText::new()
+                        .text("✖️ Task Closed: ")
+                        .rendered(summary, html_summary)
+                        .finish();
+                    self.send_matrix_message(room_id, &message, Some(html_message))
+                        .await?;
+                }
+                None => {
+                    let message = format!(
+                        "❌ Error: Invalid task number: {}. Use `!list` to see valid numbers.",
+                        task_number
+                    );
+                    self.send_matrix_message(room_id, &message, None).await?;
+                }
             }
         } else {
             let message = "ℹ️ Info: There are no tasks in this room's to-do list.";
@@ -370,31 +583,38 @@ impl TodoList {
                 return Ok(());
             }
 
-            if task_number > 0 && task_number <= tasks.len() {
-                let task = &mut tasks[task_number - 1];
-                task.add_log(sender, log_content.clone());
-
-                let message = format!(
-                    "📝 Log Added to Task #{}:\nLog: '{}'\n\nCurrent Task Details:\n{}",
-                    task_number,
-                    log_content,
-                    task.show_details()
-                );
-                let html_message = format!(
-                    "📝 Log Added to Task #{}:<br>Log: '{}'<<br><br><b>Current Task Details:</b><br>{}",
-                    task_number,
-                    log_content,
-                    task.show_details().replace('\n', "<br>")
-                );
-                self.send_matrix_message(room_id, &message, Some(html_message))
-                    .await?;
-                self.storage.save().await?;
-            } else {
-                let message = format!(
-                    "❌ Error: Invalid task number: {}. Use `!list` to see valid numbers.",
-                    task_number
-                );
-                self.send_matrix_message(room_id, &message, None).await?;
+            match nth_task_mut(tasks, task_number) {
+                Some(task) if task.status == TaskStatus::Closed => {
+                    self.send_closed_task_error(room_id, task_number).await?;
+                }
+                Some(task) => {
+                    task.add_log(&sender, log_content.clone());
+                    self.storage.mark_dirty();
+                    let (details, html_details) = task.show_details();
+
+                    let mut text = RichText::new();
+                    let _ = write!(text, "📝 Log Added to Task #{}:", task_number);
+                    let (message, html_message) = text
+                        .line_break()
+                        .text("Log: '")
+                        .text(&log_content)
+                        .text("'")
+                        .line_break()
+                        .line_break()
+                        .rendered("Current Task Details:", "<b>Current Task Details:</b>")
+                        .line_break()
+                        .rendered(&details, &html_details)
+                        .finish();
+                    self.send_matrix_message(room_id, &message, Some(html_message))
+                        .await?;
+                }
+                None => {
+                    let message = format!(
+                        "❌ Error: Invalid task number: {}. Use `!list` to see valid numbers.",
+                        task_number
+                    );
+                    self.send_matrix_message(room_id, &message, None).await?;
+                }
             }
         } else {
             let message = "ℹ️ Info: There are no tasks in this room's to-do list.";
@@ -414,11 +634,13 @@ impl TodoList {
                 return Ok(());
             }
 
-            if task_number > 0 && task_number <= tasks.len() {
-                let task = &tasks[task_number - 1];
-                let details = task.show_details();
-                let message = format!("🔍 Task Details:\n{}", details);
-                let html_message = format!("🔍 Task Details:<br>{}", details.replace('\n', "<br>"));
+            if let Some(task) = nth_task(tasks, task_number) {
+                let (details, html_details) = task.show_details();
+                let (message, html_message) = RichText::new()
+                    .text("🔍 Task Details:")
+                    .line_break()
+                    .rendered(&details, &html_details)
+                    .finish();
                 self.send_matrix_message(room_id, &message, Some(html_message))
                     .await?;
             } else {
@@ -435,6 +657,19 @@ impl TodoList {
         Ok(())
     }
 
+    /// Closed tasks are hidden from `!list` and can no longer be changed
+    async fn send_closed_task_error(
+        &self,
+        room_id: &OwnedRoomId,
+        task_number: usize,
+    ) -> Result<()> {
+        let message = format!(
+            "❌ Error: Task {} is closed and can no longer be changed.",
+            task_number
+        );
+        self.send_matrix_message(room_id, &message, None).await
+    }
+
     // Use MessageSender trait to send messages without directly depending on Matrix SDK
     pub async fn send_matrix_message(
         &self,
@@ -464,28 +699,37 @@ impl TodoList {
                 return Ok(());
             }
 
-            if task_number > 0 && task_number <= tasks.len() {
-                let task = &mut tasks[task_number - 1];
-                let old_title = task.title.clone();
-                task.set_title(sender, new_title.clone());
-
-                let message = format!(
-                    "✏️ Task Edited: Task #{} title changed:\nFrom: {}\nTo: {}",
-                    task_number, old_title, new_title
-                );
-                let html_message = format!(
-                    "✏️ Task Edited: Task #{} title changed:<br><b>From:</b> {}<br><b>To:</b> {}",
-                    task_number, old_title, new_title
-                );
-                self.send_matrix_message(room_id, &message, Some(html_message))
-                    .await?;
-                self.storage.save().await?;
-            } else {
-                let message = format!(
-                    "❌ Error: Invalid task number: {}. Use `!list` to see valid numbers.",
-                    task_number
-                );
-                self.send_matrix_message(room_id, &message, None).await?;
+            match nth_task_mut(tasks, task_number) {
+                Some(task) if task.status == TaskStatus::Closed => {
+                    self.send_closed_task_error(room_id, task_number).await?;
+                }
+                Some(task) => {
+                    let old_title = task.title.clone();
+                    task.set_title(&sender, new_title.clone());
+                    self.storage.mark_dirty();
+
+                    let mut text = RichText::new();
+                    let _ = write!(text, "✏️ Task Edited: Task #{} title changed:", task_number);
+                    let (message, html_message) = text
+                        .line_break()
+                        .rendered("From:", "<b>From:</b>")
+                        .text(" ")
+                        .text(&old_title)
+                        .line_break()
+                        .rendered("To:", "<b>To:</b>")
+                        .text(" ")
+                        .text(&new_title)
+                        .finish();
+                    self.send_matrix_message(room_id, &message, Some(html_message))
+                        .await?;
+                }
+                None => {
+                    let message = format!(
+                        "❌ Error: Invalid task number: {}. Use `!list` to see valid numbers.",
+                        task_number
+                    );
+                    self.send_matrix_message(room_id, &message, None).await?;
+                }
             }
         } else {
             let message = "ℹ️ Info: There are no tasks in this room's to-do list.";
@@ -494,3 +738,131 @@ impl TodoList {
         Ok(())
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn entries(logs: &InternalLogs) -> Vec<(&str, &str, &str)> {
+        logs.iter().collect()
+    }
+
+    #[test]
+    fn loads_legacy_row_history() {
+        for rows in 1..=4 {
+            let legacy: Vec<(String, String, String)> = (0..rows)
+                .map(|i| {
+                    (
+                        format!("2024-01-01 00:00:0{}", i),
+                        format!("@user{}:example.org", i),
+                        format!("Added log: 'entry {}'", i),
+                    )
+                })
+                .collect();
+            let json = serde_json::to_string(&legacy).unwrap();
+
+            let logs: InternalLogs = serde_json::from_str(&json).unwrap();
+
+            assert_eq!(logs.len(), rows, "{} legacy rows", rows);
+            for (entry, (timestamp, user, action)) in entries(&logs).into_iter().zip(&legacy) {
+                assert_eq!(entry, (timestamp.as_str(), user.as_str(), action.as_str()));
+            }
+            assert!(logs.events.iter().all(|&e| e == TaskEvent::LogAdded));
+            assert!(logs.truncated.is_empty());
+        }
+    }
+
+    #[test]
+    fn legacy_rows_recover_events_from_actions() {
+        let json = r#"[
+            ["2024-01-01 00:00:00", "@a:example.org", "Created task"],
+            ["2024-01-01 00:00:01", "@a:example.org", "Updated status: from 'pending' to 'done'"],
+            ["2024-01-01 00:00:02", "@b:example.org", "Edited title: from 'a' to 'b'"]
+        ]"#;
+
+        let logs: InternalLogs = serde_json::from_str(json).unwrap();
+
+        assert_eq!(
+            Vec::from(logs.events),
+            [
+                TaskEvent::Created,
+                TaskEvent::StatusUpdated,
+                TaskEvent::TitleEdited
+            ]
+        );
+    }
+
+    #[test]
+    fn columns_round_trip_with_truncated() {
+        let mut logs = InternalLogs::default();
+        logs.push(
+            "2024-01-01 00:00:00".to_owned(),
+            intern_user("@a:example.org"),
+            TaskEvent::Created,
+            "Created task".to_owned(),
+        );
+        logs.push(
+            "2024-01-01 00:00:01".to_owned(),
+            intern_user("@b:example.org"),
+            TaskEvent::LogAdded,
+            "Added log: 'x'".to_owned(),
+        );
+        logs.truncated.insert(TaskEvent::LogAdded, 3);
+        logs.truncated.insert(TaskEvent::TitleEdited, 1);
+
+        let json = serde_json::to_value(&logs).unwrap();
+        assert!(json.get("events").is_none());
+        let loaded: InternalLogs = serde_json::from_value(json).unwrap();
+
+        assert_eq!(entries(&loaded), entries(&logs));
+        assert_eq!(loaded.events, logs.events);
+        assert_eq!(loaded.truncated, logs.truncated);
+    }
+
+    #[test]
+    fn history_is_capped_and_summarized() {
+        let mut task = Task::new("@a:example.org", 1, "title".to_owned());
+        for i in 0..MAX_HISTORY {
+            task.add_log("@a:example.org", format!("log {}", i));
+        }
+
+        assert_eq!(task.internal_logs.len(), MAX_HISTORY);
+        assert_eq!(task.logs.len(), MAX_HISTORY);
+        assert_eq!(
+            task.internal_logs.truncated,
+            BTreeMap::from([(TaskEvent::Created, 1)])
+        );
+        assert_eq!(
+            task.internal_logs.truncated_summary().as_deref(),
+            Some("(+1 older entries: 1× Created task)")
+        );
+        assert_eq!(
+            task.internal_logs
+                .iter()
+                .next()
+                .map(|(_, _, action)| action),
+            Some("Added log: 'log 0'")
+        );
+    }
+
+    #[test]
+    fn history_under_cap_has_no_summary() {
+        let task = Task::new("@a:example.org", 1, "title".to_owned());
+        assert_eq!(task.internal_logs.truncated_summary(), None);
+    }
+
+    #[test]
+    fn preview_cuts_multibyte_text_at_char_boundary() {
+        let exact = "é".repeat(PREVIEW_LEN);
+        assert_eq!(preview(&exact), format!("'{}'", exact));
+
+        let long = format!("{}ü🙂", "é".repeat(PREVIEW_LEN - 1));
+        assert_eq!(
+            preview(&long),
+            format!("'{}ü...'", "é".repeat(PREVIEW_LEN - 1))
+        );
+
+        let short = "ünïcødé 🙂";
+        assert_eq!(preview(short), format!("'{}'", short));
+    }
+}